@@ -8,6 +8,9 @@ if __name__ == "__main__":
     local_output_path = 'json_output/'
     sql_output_path = 'sql_output/'
 
+    # Compile mapping files once, changed files are picked up on refresh
+    mapping_registry = mapping_functions.MappingRegistry(local_mappings_path)
+
     # Loop through each mapping file
     for mapping_filename in os.listdir(local_mappings_path):
         if mapping_filename.endswith('.json'):
@@ -20,7 +23,7 @@ if __name__ == "__main__":
                     with open(input_file_path) as f:
                         payload_dict = json.load(f)
                     
-                        mapped_tables = mapping_functions.process_mappings_local(payload_dict, local_mappings_path)
+                        mapped_tables = mapping_registry.process(payload_dict)
                     
                         # Save output
                         base_name = filename.replace('.json', '')
@@ -1,8 +1,12 @@
+import copy
 import hashlib
 import json
+from collections import OrderedDict
 from datetime import datetime, timezone
 import os
 import re
+import threading
+import time
 from typing import Any, Dict, List, Tuple
 
 
@@ -74,17 +78,7 @@ def get_value_from_payload(mapping: str, payload: Dict[str, Any]) -> Any:
         func_args = mapping[round_bracket_pos + 1:func_end_pos]
 
         # Split arguments safely
-        args = []
-        stack, start = [], 0
-        for i, ch in enumerate(func_args):
-            if ch == '(':
-                stack.append('(')
-            elif ch == ')':
-                if stack: stack.pop()
-            elif ch == ',' and not stack:
-                args.append(func_args[start:i].strip())
-                start = i + 1
-        args.append(func_args[start:].strip())
+        args = _split_function_args(func_args)
 
         # Process functions
 		# Input: concat('Hello', ' ', 'World ')
@@ -266,6 +260,23 @@ def get_value_from_payload(mapping: str, payload: Dict[str, Any]) -> Any:
     else:
         return None
 
+
+def _split_function_args(func_args: str) -> List[str]:
+    """Split function arguments on top-level commas, ignoring commas inside nested function calls."""
+    args = []
+    stack, start = [], 0
+    for i, ch in enumerate(func_args):
+        if ch == '(':
+            stack.append('(')
+        elif ch == ')':
+            if stack: stack.pop()
+        elif ch == ',' and not stack:
+            args.append(func_args[start:i].strip())
+            start = i + 1
+    args.append(func_args[start:].strip())
+    return args
+
+
 def validate_datatype(source_value, mapping_datatype):
     """
     Validate and convert source_value to the specified datatype.
@@ -414,7 +425,7 @@ def validate_datatype(source_value, mapping_datatype):
         return None, {'datatype': mapping_datatype, 'value': source_value, 'error': f'Validation failed, {str(e)}'}
             
 
-def process_mappings_local(payload_dict: dict, local_path: str) -> dict:
+def process_mappings_local(payload_dict: dict, local_path: str, deduplicator: 'PayloadDeduplicator' = None) -> dict:
     """
     Go through each mapping JSON file from local path and create dictionary of mapped tables from payload_dict.
     Returned dictionary will have 'error' key storing all files that had issues.
@@ -422,8 +433,14 @@ def process_mappings_local(payload_dict: dict, local_path: str) -> dict:
     Args:
         payload_dict: The payload to map
         local_path: Local directory path to read mapping files from
+        deduplicator: Optional PayloadDeduplicator, {'duplicate': True} is returned for already seen payloads
+                      and payloads are only remembered when mapped without errors
     """
     mapped_tables = {}
+
+    dedup_key = deduplicator.payload_key(payload_dict) if deduplicator is not None else None
+    if deduplicator is not None and deduplicator.seen(payload_dict, key=dedup_key):
+        return {'duplicate': True}
     
     try:
         # Read from local directory
@@ -464,10 +481,264 @@ def process_mappings_local(payload_dict: dict, local_path: str) -> dict:
     except Exception as e:
         import traceback
         mapped_tables.setdefault('error', []).append({'error': str(e), 'traceback': traceback.format_exc()})
+
+    if deduplicator is not None and 'error' not in mapped_tables:
+        deduplicator.remember(payload_dict, key=dedup_key)
     
     return mapped_tables
 
 
+class MappingRegistry:
+    """
+    Keep compiled mapping files from a local path in memory for long-running processes.
+
+    Files are re-checked at most once every check_interval seconds. Only files whose
+    mtime/size changed are re-read, and only files whose content hash changed are
+    re-parsed. Files modified within racy_window seconds of being read are re-read
+    until their mtime is old enough, so a same-size edit in the same mtime tick is
+    not missed on filesystems with coarse timestamps. The active plan is an immutable tuple that is swapped in one assignment,
+    so payloads already being mapped finish on the plan they started with.
+
+    Args:
+        local_path: Local directory path to read mapping files from
+        check_interval: Minimum number of seconds between two checks of the directory
+    """
+
+    racy_window = 2.0
+
+    def __init__(self, local_path: str, check_interval: float = 2.0):
+        self.local_path = local_path
+        self.check_interval = check_interval
+        self._files: Dict[str, Tuple[int, int, str, int, Any]] = {}  # file_name -> (mtime_ns, size, sha256, read_ns, compiled entry)
+        self._active: Tuple[Tuple[Tuple[str, Any], ...], dict] = ((), None)  # (plan, plan_error), always swapped together
+        self._last_check = None
+        self._lock = threading.Lock()
+        self.refresh(force=True)
+
+    def refresh(self, force: bool = False) -> bool:
+        """
+        Recompile changed mapping files and swap the active plan.
+
+        Returns:
+            True if the active mappings changed, False otherwise
+        """
+        now = time.monotonic()
+        if not force and self._last_check is not None and now - self._last_check < self.check_interval:
+            return False
+
+        with self._lock:
+            self._last_check = now
+
+            if not os.path.exists(self.local_path):
+                return self._swap((), {'error': {'mapping_file': 'N/A', 'error': f'Local path {self.local_path} does not exist'}})
+            if not os.path.isdir(self.local_path):
+                return self._swap((), {'error': {'mapping_file': 'N/A', 'error': f'Local path {self.local_path} is not a directory'}})
+
+            all_files = [f for f in os.listdir(self.local_path) if os.path.isfile(os.path.join(self.local_path, f))]
+            json_files_found = [f for f in all_files if f.endswith('.json')]
+            if len(json_files_found) == 0:
+                return self._swap((), {'error': {'mapping_file': 'N/A', 'error': f'No .json files found in {self.local_path}. Found {len(all_files)} total files.'}})
+
+            files = {}
+            for file_name in json_files_found:
+                file_path = os.path.join(self.local_path, file_name)
+                try:
+                    stat = os.stat(file_path)
+                    cached = self._files.get(file_name)
+                    if (
+                        cached is not None and cached[0] == stat.st_mtime_ns and cached[1] == stat.st_size
+                        and stat.st_mtime_ns < cached[3] - int(self.racy_window * 1e9)
+                    ):
+                        files[file_name] = cached
+                        continue
+
+                    read_ns = time.time_ns()
+                    with open(file_path, 'rb') as f:
+                        file_bytes = f.read()
+                    content_hash = hashlib.sha256(file_bytes).hexdigest()
+                    if cached is not None and cached[2] == content_hash:
+                        # Touched but not changed, keep the compiled mapping
+                        files[file_name] = (stat.st_mtime_ns, stat.st_size, content_hash, read_ns, cached[4])
+                        continue
+
+                    try:
+                        compiled = json.loads(file_bytes.decode('utf-8'))
+                    except Exception as file_err:
+                        import traceback
+                        compiled = {'mapping_file': file_name, 'error': str(file_err), 'traceback': traceback.format_exc()}
+                        files[file_name] = (stat.st_mtime_ns, stat.st_size, content_hash, read_ns, (False, compiled))
+                    else:
+                        files[file_name] = (stat.st_mtime_ns, stat.st_size, content_hash, read_ns, (True, compiled))
+                except OSError as file_err:
+                    # Deleted or unreadable between listing and reading, retry on the next check
+                    import traceback
+                    files[file_name] = (-1, -1, '', 0, (False, {'mapping_file': file_name, 'error': str(file_err), 'traceback': traceback.format_exc()}))
+
+            unchanged = files.keys() == self._files.keys() and all(files[k][4] is self._files[k][4] for k in files)
+            self._files = files
+            if unchanged and self._active[1] is None:
+                return False
+            return self._swap(tuple((file_name, files[file_name][4]) for file_name in json_files_found), None)
+
+    def _swap(self, plan: Tuple[Tuple[str, Any], ...], plan_error: dict) -> bool:
+        """Replace the active plan in a single assignment."""
+        if plan_error is not None:
+            self._files = {}
+        changed = (plan, plan_error) != self._active
+        self._active = (plan, plan_error)
+        return changed
+
+    def process(self, payload_dict: dict, deduplicator: 'PayloadDeduplicator' = None) -> dict:
+        """
+        Create dictionary of mapped tables from payload_dict using the active plan.
+        Output is the same as process_mappings_local for the same mapping files.
+
+        Args:
+            payload_dict: The payload to map
+            deduplicator: Optional PayloadDeduplicator, {'duplicate': True} is returned for already seen payloads
+                          and payloads are only remembered when mapped without errors
+        """
+        dedup_key = deduplicator.payload_key(payload_dict) if deduplicator is not None else None
+        if deduplicator is not None and deduplicator.seen(payload_dict, key=dedup_key):
+            return {'duplicate': True}
+
+        self.refresh()
+        plan, plan_error = self._active  # Pin the plan for this payload
+        if plan_error is not None:
+            return copy.deepcopy(plan_error)  # Callers may edit errors, keep the cached one intact
+
+        mapped_tables = {}
+        for file_name, (ok, compiled) in plan:
+            if not ok:
+                mapped_tables.setdefault('error', []).append(dict(compiled))
+                continue
+            try:
+                result = _process_single_mapping(compiled, payload_dict, file_name, mapped_tables)
+                if result:
+                    mapped_tables = result
+            except Exception as file_err:
+                import traceback
+                mapped_tables.setdefault('error', []).append({'mapping_file': file_name, 'error': str(file_err), 'traceback': traceback.format_exc()})
+
+        if deduplicator is not None and 'error' not in mapped_tables:
+            deduplicator.remember(payload_dict, key=dedup_key)
+
+        return mapped_tables
+
+
+class PayloadDeduplicator:
+    """
+    Bounded seen-set used to skip payloads that were already mapped (at-least-once redelivery).
+
+    The identity of a payload is identity_mapping evaluated with get_value_from_payload
+    (e.g. "concat(order_header.order_id, order_header.order_lifecycle_event)"), or a sha256
+    digest of the whole payload when identity_mapping is not set or evaluates to None/''.
+    For a concat() identity the digest is also used when any argument evaluates to None/'',
+    so payloads missing part of their identity don't collide.
+    The newest max_size identities are kept in LRU order and can be persisted to state_path.
+
+    Args:
+        identity_mapping: Optional mapping expression used as payload identity
+        max_size: Maximum number of identities remembered
+        state_path: Optional JSON file to load seen identities from and save them to
+    """
+
+    def __init__(self, identity_mapping: str = None, max_size: int = 100000, state_path: str = None):
+        self.identity_mapping = identity_mapping
+        concat_match = re.fullmatch(r'\s*concat\s*\((.*)\)\s*', identity_mapping or '', re.DOTALL)
+        self._identity_parts = _split_function_args(concat_match.group(1)) if concat_match else [identity_mapping]
+        self.max_size = max_size
+        self.state_path = state_path
+        self.stats = {'processed': 0, 'duplicates': 0, 'remembered': 0, 'evicted': 0}
+        self._seen = OrderedDict()
+        self._lock = threading.Lock()
+        if state_path and os.path.exists(state_path):
+            self.load()
+
+    def payload_key(self, payload_dict: dict) -> str:
+        """
+        Return the identity of payload_dict, prefixed with 'id:' or 'sha256:' so the two kinds never collide.
+        Never raises: an identity_mapping that fails on this payload falls back to the digest, and values
+        json can't serialize (e.g. Decimal) are digested as str.
+        """
+        if self.identity_mapping:
+            try:
+                if all(
+                    (part_value := get_value_from_payload(part, payload_dict)) is not None and part_value != ''
+                    for part in self._identity_parts
+                ):
+                    identity = get_value_from_payload(self.identity_mapping, payload_dict)
+                    if identity is not None and identity != '':
+                        return 'id:' + (identity if isinstance(identity, str) else json.dumps(identity, sort_keys=True, default=str))
+            except Exception:
+                pass  # Fall back to the digest
+        try:
+            payload_json = json.dumps(payload_dict, sort_keys=True, default=str)
+        except (TypeError, ValueError):
+            # Unsortable keys or circular references
+            payload_json = repr(payload_dict)
+        return 'sha256:' + hashlib.sha256(payload_json.encode('utf-8')).hexdigest()
+
+    def seen(self, payload_dict: dict, key: str = None) -> bool:
+        """
+        Check payload_dict against the seen-set without remembering it.
+
+        Args:
+            payload_dict: The payload to check
+            key: Optional payload_key(payload_dict) already computed by the caller
+
+        Returns:
+            True if the payload was already seen, False otherwise
+        """
+        if key is None:
+            key = self.payload_key(payload_dict)
+        with self._lock:
+            if key in self._seen:
+                self._seen.move_to_end(key)
+                self.stats['duplicates'] += 1
+                return True
+            self.stats['processed'] += 1
+            return False
+
+    def remember(self, payload_dict: dict, key: str = None) -> None:
+        """Add payload_dict to the seen-set, call once it was mapped successfully. key is as in seen()."""
+        if key is None:
+            key = self.payload_key(payload_dict)
+        with self._lock:
+            if key in self._seen:
+                self._seen.move_to_end(key)
+                return
+            self._seen[key] = None
+            self.stats['remembered'] += 1
+            while len(self._seen) > self.max_size:
+                self._seen.popitem(last=False)
+                self.stats['evicted'] += 1
+
+    def load(self) -> None:
+        """Load seen identities from state_path, oldest first. Starts empty if the file can't be used."""
+        try:
+            with open(self.state_path, 'r', encoding='utf-8') as f:
+                state = json.load(f)
+            keys = state.get('keys') if isinstance(state, dict) else None
+            if not isinstance(keys, list) or not all(isinstance(key, str) for key in keys):
+                keys = []
+        except (OSError, ValueError, TypeError):
+            keys = []
+        with self._lock:
+            self._seen = OrderedDict((key, None) for key in (keys[-self.max_size:] if self.max_size > 0 else []))
+
+    def save(self) -> None:
+        """Save seen identities to state_path, replacing the file atomically."""
+        if not self.state_path:
+            raise ValueError('Invalid deduplicator: state_path is required to save seen identities')
+        with self._lock:
+            keys = list(self._seen)
+        tmp_path = f'{self.state_path}.tmp'
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump({'keys': keys}, f)
+        os.replace(tmp_path, self.state_path)
+
+
 def _process_single_mapping(mapping_dict: dict, payload_dict: dict, file_key: str, mapped_tables: dict) -> dict:
     """
     Process a single mapping file and update the mapped_tables dictionary.
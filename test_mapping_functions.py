@@ -0,0 +1,154 @@
+import json
+import os
+
+import mapping_functions
+
+
+MAPPING = {
+    "filter": [{"attribute": "order_header.order_status", "value": "CREATED"}],
+    "mapping": [{
+        "table_name": "orders",
+        "columns": [{"name": "id", "datatype": "VARCHAR", "mapping": "order_header.order_id"}]
+    }]
+}
+
+PAYLOAD = {"order_header": {"order_id": "ORD-001", "order_status": "CREATED", "order_lifecycle_event": "order_created"}}
+
+
+def write_mapping(path, mapping_dict):
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(mapping_dict, f)
+
+
+def renamed_mapping(table_name):
+    mapping_dict = json.loads(json.dumps(MAPPING))
+    mapping_dict["mapping"][0]["table_name"] = table_name
+    return mapping_dict
+
+
+# MappingRegistry
+def test_registry_matches_process_mappings_local(tmp_path):
+    write_mapping(tmp_path / "mapping_1.json", MAPPING)
+    registry = mapping_functions.MappingRegistry(str(tmp_path))
+    assert registry.process(PAYLOAD) == {"orders": [{"id": "ORD-001"}]}
+    assert registry.process(PAYLOAD) == mapping_functions.process_mappings_local(PAYLOAD, str(tmp_path))
+
+
+def test_registry_keeps_compiled_mapping_for_touched_file(tmp_path):
+    mapping_path = tmp_path / "mapping_1.json"
+    write_mapping(mapping_path, MAPPING)
+    registry = mapping_functions.MappingRegistry(str(tmp_path), check_interval=0)
+    plan = registry._active[0]
+
+    stat = os.stat(mapping_path)
+    os.utime(mapping_path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 5_000_000_000))
+    assert registry.refresh() is False
+    assert registry._active[0] is plan
+
+
+def test_registry_reloads_changed_file(tmp_path):
+    write_mapping(tmp_path / "mapping_1.json", MAPPING)
+    registry = mapping_functions.MappingRegistry(str(tmp_path), check_interval=0)
+
+    write_mapping(tmp_path / "mapping_1.json", renamed_mapping("orders_v2"))
+    assert registry.refresh() is True
+    assert registry.process(PAYLOAD) == {"orders_v2": [{"id": "ORD-001"}]}
+
+
+def test_registry_reloads_same_size_edit_with_same_mtime(tmp_path):
+    mapping_path = tmp_path / "mapping_1.json"
+    write_mapping(mapping_path, renamed_mapping("orders_a"))
+    stat = os.stat(mapping_path)
+    registry = mapping_functions.MappingRegistry(str(tmp_path), check_interval=0)
+
+    write_mapping(mapping_path, renamed_mapping("orders_b"))
+    os.utime(mapping_path, ns=(stat.st_atime_ns, stat.st_mtime_ns))
+    assert registry.refresh() is True
+    assert registry.process(PAYLOAD) == {"orders_b": [{"id": "ORD-001"}]}
+
+
+def test_registry_reports_unparseable_file(tmp_path):
+    write_mapping(tmp_path / "mapping_1.json", MAPPING)
+    (tmp_path / "mapping_2.json").write_text("{", encoding='utf-8')
+    registry = mapping_functions.MappingRegistry(str(tmp_path))
+
+    mapped_tables = registry.process(PAYLOAD)
+    expected = mapping_functions.process_mappings_local(PAYLOAD, str(tmp_path))
+    assert mapped_tables["orders"] == expected["orders"]
+    assert [e["error"] for e in mapped_tables["error"]] == [e["error"] for e in expected["error"]]
+
+    # Returned errors are copies of the cached ones
+    mapped_tables["error"][0]["error"] = "edited"
+    assert registry.process(PAYLOAD)["error"][0]["error"] != "edited"
+
+
+def test_registry_reports_directory_without_mapping_files(tmp_path):
+    (tmp_path / "notes.txt").write_text("not a mapping", encoding='utf-8')
+    registry = mapping_functions.MappingRegistry(str(tmp_path))
+    assert registry.process(PAYLOAD) == {
+        'error': {'mapping_file': 'N/A', 'error': f'No .json files found in {tmp_path}. Found 1 total files.'}
+    }
+
+
+# PayloadDeduplicator
+def test_deduplicator_skips_duplicate(tmp_path):
+    write_mapping(tmp_path / "mapping_1.json", MAPPING)
+    deduplicator = mapping_functions.PayloadDeduplicator(
+        identity_mapping="concat(order_header.order_id, order_header.order_lifecycle_event)"
+    )
+    assert mapping_functions.process_mappings_local(PAYLOAD, str(tmp_path), deduplicator) == {"orders": [{"id": "ORD-001"}]}
+    assert mapping_functions.process_mappings_local(PAYLOAD, str(tmp_path), deduplicator) == {'duplicate': True}
+    assert mapping_functions.MappingRegistry(str(tmp_path)).process(PAYLOAD, deduplicator) == {'duplicate': True}
+    assert deduplicator.stats == {'processed': 1, 'duplicates': 2, 'remembered': 1, 'evicted': 0}
+
+
+def test_deduplicator_does_not_remember_failed_payload(tmp_path):
+    write_mapping(tmp_path / "mapping_1.json", MAPPING)
+    deduplicator = mapping_functions.PayloadDeduplicator()
+    assert 'error' in mapping_functions.process_mappings_local(PAYLOAD, str(tmp_path / "missing"), deduplicator)
+    assert mapping_functions.process_mappings_local(PAYLOAD, str(tmp_path), deduplicator) == {"orders": [{"id": "ORD-001"}]}
+
+
+def test_deduplicator_payload_key_falls_back_to_digest():
+    deduplicator = mapping_functions.PayloadDeduplicator(
+        identity_mapping="concat(order_header.order_id, order_header.order_lifecycle_event)"
+    )
+    assert deduplicator.payload_key(PAYLOAD) == 'id:ORD-001order_created'
+
+    missing_id = {"order_header": {"order_lifecycle_event": "order_created"}}
+    assert deduplicator.payload_key(missing_id).startswith('sha256:')
+
+    failing = mapping_functions.PayloadDeduplicator(identity_mapping="substring(order_header.order_id, 'x', 2)")
+    assert failing.payload_key(PAYLOAD).startswith('sha256:')
+
+
+def test_deduplicator_evicts_least_recently_seen():
+    deduplicator = mapping_functions.PayloadDeduplicator(max_size=2)
+    for payload in ({'n': 1}, {'n': 2}):
+        assert deduplicator.seen(payload) is False
+        deduplicator.remember(payload)
+    assert deduplicator.seen({'n': 1}) is True  # {'n': 2} is now least recently seen
+
+    deduplicator.remember({'n': 3})
+    assert deduplicator.seen({'n': 2}) is False
+    assert deduplicator.seen({'n': 1}) is True
+    assert deduplicator.stats['evicted'] == 1
+
+
+def test_deduplicator_save_load_round_trip(tmp_path):
+    state_path = str(tmp_path / "dedup_state.json")
+    deduplicator = mapping_functions.PayloadDeduplicator(state_path=state_path)
+    deduplicator.remember({'n': 1})
+    deduplicator.remember({'n': 2})
+    deduplicator.save()
+
+    loaded = mapping_functions.PayloadDeduplicator(state_path=state_path)
+    assert list(loaded._seen) == list(deduplicator._seen)
+    assert loaded.seen({'n': 1}) is True
+    assert loaded.seen({'n': 3}) is False
+
+
+def test_deduplicator_ignores_unusable_state_file(tmp_path):
+    state_path = tmp_path / "dedup_state.json"
+    state_path.write_text('{"keys": [1,', encoding='utf-8')
+    assert len(mapping_functions.PayloadDeduplicator(state_path=str(state_path))._seen) == 0